@@ -1,5 +1,6 @@
 from pathlib import Path
 
+from safetensors.torch import load_file
 import torch
 from torch.distributions.categorical import Categorical
 import torch.nn as nn
@@ -21,7 +22,10 @@ class Agent(nn.Module):
         return self.actor_critic.conv1.weight.device
 
     def load(self, path_to_checkpoint: Path, device: torch.device, load_tokenizer: bool = True, load_world_model: bool = True, load_actor_critic: bool = True) -> None:
-        agent_state_dict = torch.load(path_to_checkpoint, map_location=device)
+        if str(path_to_checkpoint).endswith('.safetensors'):
+            agent_state_dict = load_file(path_to_checkpoint, device=str(device))
+        else:
+            agent_state_dict = torch.load(path_to_checkpoint, map_location=device)
         if load_tokenizer:
             self.tokenizer.load_state_dict(extract_state_dict(agent_state_dict, 'tokenizer'))
         if load_world_model:
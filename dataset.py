@@ -20,6 +20,7 @@ class EpisodesDataset:
         self.episodes = deque()
         self.episode_id_to_queue_idx = dict()
         self.newly_modified_episodes, self.newly_deleted_episodes = set(), set()
+        self._expanded_weights_cache = (None, None, None)  # (weights, num_episodes, expanded per-episode weights)
 
     def __len__(self) -> int:
         return len(self.episodes)
@@ -64,17 +65,24 @@ class EpisodesDataset:
     def sample_batch(self, batch_num_samples: int, sequence_length: int, weights: Optional[Tuple[float]] = None, sample_from_start: bool = True) -> Batch:
         return self._collate_episodes_segments(self._sample_episodes_segments(batch_num_samples, sequence_length, weights, sample_from_start))
 
-    def _sample_episodes_segments(self, batch_num_samples: int, sequence_length: int, weights: Optional[Tuple[float]], sample_from_start: bool) -> List[Episode]:
-        num_episodes = len(self.episodes)
-        num_weights = len(weights) if weights is not None else 0
+    def _expand_weights(self, weights: Optional[Tuple[float]], num_episodes: int) -> List[float]:
+        cached_weights, cached_num_episodes, cached_expanded = self._expanded_weights_cache
+        if cached_weights == weights and cached_num_episodes == num_episodes:
+            return cached_expanded
 
+        num_weights = len(weights) if weights is not None else 0
         if num_weights < num_episodes:
-            weights = [1] * num_episodes
+            expanded = [1] * num_episodes
         else:
             assert all([0 <= x <= 1 for x in weights]) and sum(weights) == 1
             sizes = [num_episodes // num_weights + (num_episodes % num_weights) * (i == num_weights - 1) for i in range(num_weights)]
-            weights = [w / s for (w, s) in zip(weights, sizes) for _ in range(s)]
+            expanded = [w / s for (w, s) in zip(weights, sizes) for _ in range(s)]
 
+        self._expanded_weights_cache = (weights, num_episodes, expanded)
+        return expanded
+
+    def _sample_episodes_segments(self, batch_num_samples: int, sequence_length: int, weights: Optional[Tuple[float]], sample_from_start: bool) -> List[Episode]:
+        weights = self._expand_weights(weights, len(self.episodes))
         sampled_episodes = random.choices(self.episodes, k=batch_num_samples, weights=weights)
 
         sampled_episodes_segments = []
@@ -95,6 +103,8 @@ class EpisodesDataset:
         for k in episodes_segments[0]:
             batch[k] = torch.stack([e_s[k] for e_s in episodes_segments])
         batch['observations'] = batch['observations'].float() / 255.0  # int8 to float and scale
+        if torch.cuda.is_available():
+            batch = {k: v.pin_memory() for k, v in batch.items()}  # enables async H2D copies
         return batch
 
     def traverse(self, batch_num_samples: int, chunk_size: int):
@@ -2,6 +2,7 @@ from dataclasses import astuple, dataclass
 from enum import Enum
 from multiprocessing import Pipe, Process
 from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
 from typing import Any, Callable, Iterator, List, Optional, Tuple
 # from pyvirtualdisplay import Display
 import numpy as np
@@ -28,20 +29,25 @@ class Message:
         return iter(astuple(self))
 
 
-def child_env(child_id: int, env, child_conn: Connection) -> None:
+def child_env(child_id: int, env, child_conn: Connection, shm_name: str, obs_shape: Tuple[int, ...], obs_dtype) -> None:
     np.random.seed(child_id + np.random.randint(0, 2 ** 31 - 1))
+    shm = SharedMemory(name=shm_name)
+    obs_nbytes = int(np.prod(obs_shape)) * np.dtype(obs_dtype).itemsize
+    obs_slot = np.ndarray(obs_shape, dtype=obs_dtype, buffer=shm.buf, offset=child_id * obs_nbytes)
     try:
       while True:
         message_type, content = child_conn.recv()
         if message_type == MessageType.RESET:
-            obs = env.reset()
-            child_conn.send(Message(MessageType.RESET_RETURN, obs))
+            obs_slot[...] = env.reset()  # observations go through shared memory, not the pipe
+            child_conn.send(Message(MessageType.RESET_RETURN))
         elif message_type == MessageType.STEP:
             obs, rew, done, _ = env.step(content)
             if done:
                 obs = env.reset()
-            child_conn.send(Message(MessageType.STEP_RETURN, (obs, rew, done, None)))
+            obs_slot[...] = obs
+            child_conn.send(Message(MessageType.STEP_RETURN, (rew, done)))
         elif message_type == MessageType.CLOSE:
+            shm.close()
             child_conn.close()
             #disp.close()
             return
@@ -51,7 +57,7 @@ def child_env(child_id: int, env, child_conn: Connection) -> None:
         print("Error Occured!")
         print(e)
         child_conn.send(Message(MessageType.ERROR))
-    
+
 
 
 class MultiProcessEnv(DoneTrackerEnv):
@@ -59,15 +65,21 @@ class MultiProcessEnv(DoneTrackerEnv):
         super().__init__(num_envs)
         sample_env = env_fn(9999)
         self.num_actions = sample_env.action_space.n
+        obs_space = sample_env.observation_space
         sample_env.close()
         self.should_wait_num_envs_ratio = should_wait_num_envs_ratio
+
+        obs_nbytes = int(np.prod(obs_space.shape)) * np.dtype(obs_space.dtype).itemsize
+        self._shm = SharedMemory(create=True, size=num_envs * obs_nbytes)
+        self.obs_buffer = np.ndarray((num_envs, *obs_space.shape), dtype=obs_space.dtype, buffer=self._shm.buf)
+
         self.processes, self.parent_conns = [], []
         for child_id in range(num_envs):
             cenv = env_fn(child_id)
             parent_conn, child_conn = Pipe()
             self.parent_conns.append(parent_conn)
-            
-            p = Process(target=child_env, args=(child_id, cenv, child_conn), daemon=True)
+
+            p = Process(target=child_env, args=(child_id, cenv, child_conn, self._shm.name, obs_space.shape, obs_space.dtype), daemon=True)
             self.processes.append(p)
         for p in self.processes:
             p.start()
@@ -86,22 +98,24 @@ class MultiProcessEnv(DoneTrackerEnv):
         self.reset_done_tracker()
         for parent_conn in self.parent_conns:
             parent_conn.send(Message(MessageType.RESET))
-        content = self._receive(check_type=MessageType.RESET_RETURN)
-        return np.stack(content)
+        self._receive(check_type=MessageType.RESET_RETURN)  # acks only, observations are already in shared memory
+        return self.obs_buffer.copy()
 
     def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Any]:
         for parent_conn, action in zip(self.parent_conns, actions):
             parent_conn.send(Message(MessageType.STEP, action))
         content = self._receive(check_type=MessageType.STEP_RETURN)
-        obs, rew, done, _ = zip(*content)
+        rew, done = zip(*content)
         done = np.stack(done)
         self.update_done_tracker(done)
-        return np.stack(obs), np.stack(rew), done, None
-    
+        return self.obs_buffer.copy(), np.stack(rew), done, None
+
     def close(self) -> None:
         for parent_conn in self.parent_conns:
             parent_conn.send(Message(MessageType.CLOSE))
         for p in self.processes:
             p.join()
         for parent_conn in self.parent_conns:
-            parent_conn.close()
\ No newline at end of file
+            parent_conn.close()
+        self._shm.close()
+        self._shm.unlink()
\ No newline at end of file
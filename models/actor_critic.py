@@ -34,6 +34,8 @@ class ImagineOutput:
 
 
 class ActorCritic(nn.Module):
+    name = "actor_critic"
+
     def __init__(self, act_vocab_size, use_original_obs: bool = False) -> None:
         super().__init__()
         self.use_original_obs = use_original_obs
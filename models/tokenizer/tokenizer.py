@@ -23,6 +23,8 @@ class TokenizerEncoderOutput:
 
 
 class Tokenizer(nn.Module):
+    name = "tokenizer"
+
     def __init__(self, vocab_size: int, embed_dim: int, encoder: Encoder, decoder: Decoder, with_lpips: bool = True) -> None:
         super().__init__()
         self.vocab_size = vocab_size
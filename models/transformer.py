@@ -3,13 +3,13 @@ Credits to https://github.com/karpathy/minGPT
 """
 
 from dataclasses import dataclass
-import math
 from typing import Optional
 
 from einops import rearrange
 import torch
 import torch.nn as nn
 from torch.nn import functional as F
+from torch.utils.checkpoint import checkpoint
 
 from .kv_caching import KeysValues, KVCache
 
@@ -37,6 +37,7 @@ class Transformer(nn.Module):
     def __init__(self, config: TransformerConfig) -> None:
         super().__init__()
         self.config = config
+        self.grad_checkpoint = False  # recompute block activations on backward, set by Trainer
         self.drop = nn.Dropout(config.embed_pdrop)
         self.blocks = nn.ModuleList([Block(config) for _ in range(config.num_layers)])
         self.ln_f = nn.LayerNorm(config.embed_dim)
@@ -49,7 +50,10 @@ class Transformer(nn.Module):
         assert past_keys_values is None or len(past_keys_values) == len(self.blocks)
         x = self.drop(sequences)
         for i, block in enumerate(self.blocks):
-            x = block(x, None if past_keys_values is None else past_keys_values[i])
+            if self.grad_checkpoint and self.training and past_keys_values is None:
+                x = checkpoint(block, x, use_reentrant=False)
+            else:
+                x = block(x, None if past_keys_values is None else past_keys_values[i])
 
         x = self.ln_f(x)
         return x
@@ -91,6 +95,7 @@ class SelfAttention(nn.Module):
         causal_mask = torch.tril(torch.ones(config.max_tokens, config.max_tokens))
         block_causal_mask = torch.max(causal_mask, torch.block_diag(*[torch.ones(config.tokens_per_block, config.tokens_per_block) for _ in range(config.max_blocks)]))
         self.register_buffer('mask', causal_mask if config.attention == 'causal' else block_causal_mask)
+        self.register_buffer('bool_mask', self.mask.bool(), persistent=False)  # SDPA wants bool, avoid casting per forward
 
     def forward(self, x: torch.Tensor, kv_cache: Optional[KVCache] = None) -> torch.Tensor:
         B, T, C = x.size()
@@ -108,11 +113,7 @@ class SelfAttention(nn.Module):
             kv_cache.update(k, v)
             k, v = kv_cache.get()
 
-        att = (q @ k.transpose(-2, -1)) * (1.0 / math.sqrt(k.size(-1)))
-        att = att.masked_fill(self.mask[L:L + T, :L + T] == 0, float('-inf'))
-        att = F.softmax(att, dim=-1)
-        att = self.attn_drop(att)
-        y = att @ v
+        y = F.scaled_dot_product_attention(q, k, v, attn_mask=self.bool_mask[L:L + T, :L + T], dropout_p=self.attn_drop.p if self.training else 0.0)
         y = rearrange(y, 'b h t e -> b t (h e)')
 
         y = self.resid_drop(self.proj(y))
@@ -23,6 +23,8 @@ class WorldModelOutput:
 
 
 class WorldModel(nn.Module):
+    name = "world_model"
+
     def __init__(self, obs_vocab_size: int, act_vocab_size: int, config: TransformerConfig) -> None:
         super().__init__()
         self.obs_vocab_size, self.act_vocab_size = obs_vocab_size, act_vocab_size
@@ -36,6 +38,7 @@ class WorldModel(nn.Module):
         obs_tokens_pattern = 1 - act_tokens_pattern
 
         self.pos_emb = nn.Embedding(config.max_tokens, config.embed_dim)
+        self.register_buffer('pos_ids', torch.arange(config.max_tokens), persistent=False)
 
         self.embedder = Embedder(
             max_blocks=config.max_blocks,
@@ -85,7 +88,7 @@ class WorldModel(nn.Module):
         assert num_steps <= self.config.max_tokens
         prev_steps = 0 if past_keys_values is None else past_keys_values.size
 
-        sequences = self.embedder(tokens, num_steps, prev_steps) + self.pos_emb(prev_steps + torch.arange(num_steps, device=tokens.device))
+        sequences = self.embedder(tokens, num_steps, prev_steps) + self.pos_emb(self.pos_ids[prev_steps:prev_steps + num_steps])
 
         x = self.transformer(sequences, past_keys_values)
 
@@ -1,12 +1,16 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+import os
 from pathlib import Path
-import shutil
-import sys
 import time
 from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from safetensors.torch import save_file
 import torch
+import torch.distributed
 import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
 from tqdm import tqdm
 import wandb
 
@@ -17,7 +21,7 @@ from episode import Episode
 from make_reconstructions import make_reconstructions_from_batch
 from models.actor_critic import ActorCritic
 from models.world_model import WorldModel, TransformerConfig
-from utils import configure_optimizer, EpisodeDirManager, set_seed
+from utils import configure_optimizer, EpisodeDirManager, Prefetcher, set_seed
 
 from config import *
 from envs import make_unity_gym
@@ -38,43 +42,90 @@ def create_foldername():
     return foldername
 
 
+class _ComputeLossModule(nn.Module):
+    """Adapter whose forward runs compute_loss, so DDP's all-reduce hooks fire on backward."""
+    def __init__(self, component: nn.Module) -> None:
+        super().__init__()
+        self.component = component
+
+    def forward(self, batch: Dict[str, torch.Tensor], **kwargs: Any):
+        return self.component.compute_loss(batch, **kwargs)
+
+    def __repr__(self) -> str:
+        return repr(self.component)
+
+
+class DistributedComponent(DistributedDataParallel):
+    """DDP wrapper around a _ComputeLossModule keeping the compute_loss interface of train_component."""
+    def compute_loss(self, batch: Dict[str, torch.Tensor], **kwargs: Any):
+        return self(batch, **kwargs)
+
+    def __repr__(self) -> str:
+        return repr(self.module)
+
+
 class Trainer:
     def __init__(self):
 
+        local_rank = int(os.environ.get('LOCAL_RANK', -1))  # set by torchrun
+        self.is_distributed = local_rank >= 0
+        self.rank = 0
+        if self.is_distributed:
+            torch.distributed.init_process_group(backend='nccl')
+            self.rank = torch.distributed.get_rank()
+            torch.cuda.set_device(local_rank)
+
+        wandb_cfg = dict(train_cfg.wandb)
+        if self.rank != 0:
+            wandb_cfg['mode'] = 'disabled'
         wandb.init(
             config=dict(train_cfg),
             reinit=True,
             resume=True,
-            **train_cfg.wandb
+            **wandb_cfg
         )
-        torch.backends.cuda.matmul.allow_tf32 = False
-        torch.backends.cudnn.allow_tf32 = False
-
-
+        torch.backends.cuda.matmul.allow_tf32 = train_cfg.common.tf32
+        torch.backends.cudnn.allow_tf32 = train_cfg.common.tf32
+        if train_cfg.common.tf32:
+            torch.set_float32_matmul_precision('high')
+        torch.backends.cuda.enable_flash_sdp(True)
+        torch.backends.cuda.enable_mem_efficient_sdp(True)
 
         if train_cfg.common.seed is not None:
-            set_seed(train_cfg.common.seed)
+            set_seed(train_cfg.common.seed + self.rank)  # ranks sample different batches from their replay buffers
 
         self.start_epoch = 1
-        self.device = torch.device(train_cfg.common.device)
+        self.device = torch.device(f'cuda:{local_rank}') if self.is_distributed else torch.device(train_cfg.common.device)
         self.cfg = train_cfg
 
+        self.amp = train_cfg.common.amp and self.device.type == 'cuda'
+        self.amp_dtype = torch.bfloat16 if self.amp and torch.cuda.is_bf16_supported() else torch.float16
+        self.scaler = torch.amp.GradScaler('cuda', enabled=self.amp and self.amp_dtype == torch.float16)
+        self._checkpoint_executor = ThreadPoolExecutor(max_workers=1)
+        self._checkpoint_future = None
+
         self.base_output = Path('output') / create_foldername() if not train_cfg.common.resume else Path(train_cfg.common.resume_path)
+        if self.is_distributed:
+            # All ranks must agree on one run directory; rank 0 decides (timestamps can collide or diverge across ranks).
+            run_dir = [str(self.base_output)]
+            torch.distributed.broadcast_object_list(run_dir, src=0)
+            self.base_output = Path(run_dir[0])
         self.ckpt_dir = self.base_output / 'checkpoints'
         self.media_dir = self.base_output / 'media'
         self.episode_dir = self.media_dir / 'episodes'
         self.reconstructions_dir = self.media_dir / 'reconstructions'
 
-        if not train_cfg.common.resume:
+        if not train_cfg.common.resume and self.rank == 0:
             self.base_output.mkdir(exist_ok=True, parents=True)
             self.ckpt_dir.mkdir(exist_ok=True, parents=False)
             self.media_dir.mkdir(exist_ok=True, parents=False)
             self.episode_dir.mkdir(exist_ok=True, parents=False)
             self.reconstructions_dir.mkdir(exist_ok=True, parents=False)
-        
-        episode_manager_train = EpisodeDirManager(self.episode_dir / 'train', max_num_episodes=train_cfg.collector_train.num_episodes_to_save)
-        episode_manager_test = EpisodeDirManager(self.episode_dir / 'test', max_num_episodes=train_cfg.collector_test.num_episodes_to_save)
-        self.episode_manager_imagination = EpisodeDirManager(self.episode_dir / 'imagination', max_num_episodes=train_cfg.evaluation_settings.actor_critic.num_episodes_to_save)
+
+        # Episode saving is not multi-writer safe (id bookkeeping and best_* rotation race), so only rank 0 writes media.
+        episode_manager_train = EpisodeDirManager(self.episode_dir / 'train', max_num_episodes=train_cfg.collector_train.num_episodes_to_save if self.rank == 0 else 0)
+        episode_manager_test = EpisodeDirManager(self.episode_dir / 'test', max_num_episodes=train_cfg.collector_test.num_episodes_to_save if self.rank == 0 else 0)
+        self.episode_manager_imagination = EpisodeDirManager(self.episode_dir / 'imagination', max_num_episodes=train_cfg.evaluation_settings.actor_critic.num_episodes_to_save if self.rank == 0 else 0)
 
 
         def create_env(num_envs):
@@ -104,15 +155,38 @@ class Trainer:
 
         world_model = WorldModel(obs_vocab_size=tokenizer.vocab_size, act_vocab_size=env.num_actions, config=TransformerConfig(**worldmodel_cfg))
         actor_critic = ActorCritic(**ac_cfg, act_vocab_size=env.num_actions)
+        world_model.transformer.grad_checkpoint = train_cfg.training_settings.world_model.grad_checkpoint
         self.agent = Agent(tokenizer, world_model, actor_critic).to(self.device)
 
+        if self.device.type == 'cuda':
+            self.agent.tokenizer.to(memory_format=torch.channels_last)  # cuDNN's NHWC tensor-core conv kernels
+
+        if train_cfg.common.compile:
+            # Compiling the bound forward (instead of reassigning the submodules) keeps state_dict keys free of the _orig_mod prefix.
+            self.agent.tokenizer.forward = torch.compile(self.agent.tokenizer.forward, mode='reduce-overhead', fullgraph=False)
+            wm_forward_eager = self.agent.world_model.forward
+            wm_forward_compiled = torch.compile(wm_forward_eager, mode='reduce-overhead', fullgraph=False)
+            # kv-cache calls (imagination) keep the eager path: their shapes change every step and would recompile.
+            self.agent.world_model.forward = lambda tokens, past_keys_values=None: wm_forward_eager(tokens, past_keys_values) if past_keys_values is not None else wm_forward_compiled(tokens)
+
+        def wrap_component(module: nn.Module) -> nn.Module:
+            if not self.is_distributed:
+                return module
+            return DistributedComponent(_ComputeLossModule(module), device_ids=[local_rank], gradient_as_bucket_view=True)
+
+        self.component_tokenizer = wrap_component(self.agent.tokenizer)
+        self.component_world_model = wrap_component(self.agent.world_model)
+        self.component_actor_critic = wrap_component(self.agent.actor_critic)
+
         print(f'{sum(p.numel() for p in self.agent.tokenizer.parameters())} parameters in agent.tokenizer')
         print(f'{sum(p.numel() for p in self.agent.world_model.parameters())} parameters in agent.world_model')
         print(f'{sum(p.numel() for p in self.agent.actor_critic.parameters())} parameters in agent.actor_critic')
 
-        self.optimizer_tokenizer = torch.optim.Adam(self.agent.tokenizer.parameters(), lr=train_cfg.training_settings.learning_rate)
-        self.optimizer_world_model = configure_optimizer(self.agent.world_model, train_cfg.training_settings.learning_rate, train_cfg.training_settings.world_model.weight_decay)
-        self.optimizer_actor_critic = torch.optim.Adam(self.agent.actor_critic.parameters(), lr=train_cfg.training_settings.learning_rate)
+        use_fused_adam = self.device.type == 'cuda'  # fused step needs CUDA params, agent is already on device
+        fast_adamw = {'fused': True} if use_fused_adam else {'foreach': True}  # multi-tensor apply on CPU, single kernel on CUDA
+        self.optimizer_tokenizer = torch.optim.AdamW(self.agent.tokenizer.parameters(), lr=train_cfg.training_settings.learning_rate, weight_decay=0.0, **fast_adamw)
+        self.optimizer_world_model = configure_optimizer(self.agent.world_model, train_cfg.training_settings.learning_rate, train_cfg.training_settings.world_model.weight_decay, fused=use_fused_adam)
+        self.optimizer_actor_critic = torch.optim.AdamW(self.agent.actor_critic.parameters(), lr=train_cfg.training_settings.learning_rate, weight_decay=0.0, **fast_adamw)
 
         if train_cfg.common.resume:
             self.load_checkpoint()
@@ -135,7 +209,7 @@ class Trainer:
                 to_log += self.test_collector.collect(self.agent, epoch, **self.cfg.collector_test.config)
                 to_log += self.eval_agent(epoch)
 
-            if self.cfg.training_settings.should:
+            if self.cfg.training_settings.should and self.rank == 0:
                 self.save_checkpoint(epoch, save_agent_only=not self.cfg.common.do_checkpoint)
 
             to_log.append({'duration': (time.time() - start_time) / 3600})
@@ -147,7 +221,7 @@ class Trainer:
 
     def train_agent(self, epoch: int) -> None:
         self.agent.train()
-        self.agent.zero_grad()
+        self.agent.zero_grad(set_to_none=True)
 
         metrics_tokenizer, metrics_world_model, metrics_actor_critic = {}, {}, {}
 
@@ -155,46 +229,59 @@ class Trainer:
         cfg_world_model = self.cfg.training_settings.world_model
         cfg_actor_critic = self.cfg.training_settings.actor_critic
 
-        w = self.cfg.training_settings.sampling_weights
+        w = tuple(self.cfg.training_settings.sampling_weights)  # stable tuple so the dataset's expanded-weights cache hits
 
         if epoch > cfg_tokenizer.start_after_epochs:
-            metrics_tokenizer = self.train_component(self.agent.tokenizer, self.optimizer_tokenizer, sequence_length=1, sample_from_start=True, sampling_weights=w, **cfg_tokenizer)
+            metrics_tokenizer = self.train_component(self.component_tokenizer, self.optimizer_tokenizer, sequence_length=1, sample_from_start=True, sampling_weights=w, **cfg_tokenizer)
         self.agent.tokenizer.eval()
 
         if epoch > cfg_world_model.start_after_epochs:
-            metrics_world_model = self.train_component(self.agent.world_model, self.optimizer_world_model, sequence_length=self.cfg.common.sequence_length, sample_from_start=True, sampling_weights=w, tokenizer=self.agent.tokenizer, **cfg_world_model)
+            metrics_world_model = self.train_component(self.component_world_model, self.optimizer_world_model, sequence_length=self.cfg.common.sequence_length, sample_from_start=True, sampling_weights=w, tokenizer=self.agent.tokenizer, **cfg_world_model)
         self.agent.world_model.eval()
 
         if epoch > cfg_actor_critic.start_after_epochs:
-            metrics_actor_critic = self.train_component(self.agent.actor_critic, self.optimizer_actor_critic, sequence_length=1 + self.cfg.training_settings.actor_critic.burn_in, sample_from_start=False, sampling_weights=w, tokenizer=self.agent.tokenizer, world_model=self.agent.world_model, **cfg_actor_critic)
+            metrics_actor_critic = self.train_component(self.component_actor_critic, self.optimizer_actor_critic, sequence_length=1 + self.cfg.training_settings.actor_critic.burn_in, sample_from_start=False, sampling_weights=w, tokenizer=self.agent.tokenizer, world_model=self.agent.world_model, **cfg_actor_critic)
         self.agent.actor_critic.eval()
 
         return [{'epoch': epoch, **metrics_tokenizer, **metrics_world_model, **metrics_actor_critic}]
 
     def train_component(self, component: nn.Module, optimizer: torch.optim.Optimizer, steps_per_epoch: int, batch_num_samples: int, grad_acc_steps: int, max_grad_norm: Optional[float], sequence_length: int, sampling_weights: Optional[Tuple[float]], sample_from_start: bool, **kwargs_loss: Any) -> Dict[str, float]:
-        loss_total_epoch = 0.0
+        component_name = getattr(component, 'name', str(component))  # str(nn.Module) formats the whole module tree
+        loss_total_epoch = torch.zeros((), device=self.device)
         intermediate_losses = defaultdict(float)
 
-        for _ in tqdm(range(steps_per_epoch), desc=f"Training {str(component)}", file=sys.stdout):
-            optimizer.zero_grad()
+        sample_batch = partial(self.train_dataset.sample_batch, batch_num_samples, sequence_length, sampling_weights, sample_from_start)
+        prefetcher = Prefetcher(sample_batch, num_batches=steps_per_epoch * grad_acc_steps, device=self.device)
+
+        for _ in tqdm(range(steps_per_epoch), desc=f"Training {component_name}", mininterval=0.5, miniters=max(1, steps_per_epoch // 100), leave=False):
+            optimizer.zero_grad(set_to_none=True)
             for _ in range(grad_acc_steps):
-                batch = self.train_dataset.sample_batch(batch_num_samples, sequence_length, sampling_weights, sample_from_start)
-                batch = self._to_device(batch)
+                batch = prefetcher.next()
 
-                losses = component.compute_loss(batch, **kwargs_loss) / grad_acc_steps
+                with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype, enabled=self.amp):
+                    losses = component.compute_loss(batch, **kwargs_loss)
                 loss_total_step = losses.loss_total
-                loss_total_step.backward()
-                loss_total_epoch += loss_total_step.item() / steps_per_epoch
+                self.scaler.scale(loss_total_step).backward()
+                loss_total_epoch += loss_total_step.detach() / (steps_per_epoch * grad_acc_steps)
 
                 for loss_name, loss_value in losses.intermediate_losses.items():
-                    intermediate_losses[f"{str(component)}/train/{loss_name}"] += loss_value / steps_per_epoch
+                    intermediate_losses[f"{component_name}/train/{loss_name}"] += loss_value / (steps_per_epoch * grad_acc_steps)
+
+            if grad_acc_steps > 1:
+                # One pass over the grads replaces a division over the activations of every micro-batch.
+                for p in component.parameters():
+                    if p.grad is not None:
+                        p.grad.mul_(1.0 / grad_acc_steps)
 
             if max_grad_norm is not None:
+                self.scaler.unscale_(optimizer)
                 torch.nn.utils.clip_grad_norm_(component.parameters(), max_grad_norm)
 
-            optimizer.step()
+            self.scaler.step(optimizer)
+            self.scaler.update()
 
-        metrics = {f'{str(component)}/train/total_loss': loss_total_epoch, **intermediate_losses}
+        prefetcher.join()
+        metrics = {f'{component_name}/train/total_loss': loss_total_epoch.item(), **{k: v.item() for k, v in intermediate_losses.items()}}  # single sync per metric, once per epoch
         return metrics
 
     @torch.no_grad()
@@ -216,7 +303,7 @@ class Trainer:
         if epoch > cfg_actor_critic.start_after_epochs:
             self.inspect_imagination(epoch)
 
-        if cfg_tokenizer.save_reconstructions:
+        if cfg_tokenizer.save_reconstructions and self.rank == 0:
             batch = self._to_device(self.test_dataset.sample_batch(batch_num_samples=3, sequence_length=self.cfg.common.sequence_length))
             make_reconstructions_from_batch(batch, save_dir=self.reconstructions_dir, epoch=epoch, tokenizer=self.agent.tokenizer)
 
@@ -224,25 +311,23 @@ class Trainer:
 
     @torch.no_grad()
     def eval_component(self, component: nn.Module, batch_num_samples: int, sequence_length: int, **kwargs_loss: Any) -> Dict[str, float]:
-        loss_total_epoch = 0.0
-        intermediate_losses = defaultdict(float)
+        component_name = getattr(component, 'name', str(component))
+        loss_names = None
+        batch_losses = []
 
-        steps = 0
-        pbar = tqdm(desc=f"Evaluating {str(component)}", file=sys.stdout)
+        pbar = tqdm(desc=f"Evaluating {component_name}", mininterval=0.5, miniters=10, leave=False)
         for batch in self.test_dataset.traverse(batch_num_samples, sequence_length):
             batch = self._to_device(batch)
 
             losses = component.compute_loss(batch, **kwargs_loss)
-            loss_total_epoch += losses.loss_total.item()
-
-            for loss_name, loss_value in losses.intermediate_losses.items():
-                intermediate_losses[f"{str(component)}/eval/{loss_name}"] += loss_value
+            if loss_names is None:
+                loss_names = list(losses.intermediate_losses.keys())
+            batch_losses.append(torch.stack([losses.loss_total, *losses.intermediate_losses.values()]))
 
-            steps += 1
             pbar.update(1)
 
-        intermediate_losses = {k: v / steps for k, v in intermediate_losses.items()}
-        metrics = {f'{str(component)}/eval/total_loss': loss_total_epoch / steps, **intermediate_losses}
+        mean_losses = torch.stack(batch_losses).mean(dim=0).tolist()  # single sync for the whole eval
+        metrics = {f'{component_name}/eval/total_loss': mean_losses[0], **{f'{component_name}/eval/{k}': v for k, v in zip(loss_names, mean_losses[1:])}}
         return metrics
 
     @torch.no_grad()
@@ -251,44 +336,90 @@ class Trainer:
         batch = self.test_dataset.sample_batch(batch_num_samples=self.episode_manager_imagination.max_num_episodes, sequence_length=1 + self.cfg.training_settings.actor_critic.burn_in, sample_from_start=False)
         outputs = self.agent.actor_critic.imagine(self._to_device(batch), self.agent.tokenizer, self.agent.world_model, horizon=self.cfg.evaluation_settings.actor_critic.horizon, show_pbar=True)
 
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize()  # one sync, then the D2H copies below are plain memcpys
+        observations = outputs.observations.cpu()
+        actions = outputs.actions.cpu()
+        rewards = outputs.rewards.cpu()
+        ends = outputs.ends.long().cpu()
+
+        # Vectorized per-episode metrics: an episode is truncated at its first end flag (cf. Episode.__post_init__).
+        num_episodes, horizon = actions.shape
+        has_end = ends.any(dim=1)
+        lengths = torch.where(has_end, ends.argmax(dim=1) + 1, torch.full((num_episodes,), horizon, dtype=torch.long))
+        valid_steps = torch.arange(horizon).unsqueeze(0) < lengths.unsqueeze(1)
+        returns = (rewards * valid_steps).sum(dim=1)
+
+        num_actions = self.agent.world_model.act_vocab_size
+        bin_edges = np.arange(num_actions + 1)
+
         to_log = []
-        for i, (o, a, r, d) in enumerate(zip(outputs.observations.cpu(), outputs.actions.cpu(), outputs.rewards.cpu(), outputs.ends.long().cpu())):  # Make everything (N, T, ...) instead of (T, N, ...)
-            episode = Episode(o, a, r, d, torch.ones_like(d))
-            episode_id = (epoch - 1 - self.cfg.training_settings.actor_critic.start_after_epochs) * outputs.observations.size(0) + i
+        for i in range(num_episodes):
+            episode = Episode(observations[i], actions[i], rewards[i], ends[i], torch.ones_like(ends[i]))
+            episode_id = (epoch - 1 - self.cfg.training_settings.actor_critic.start_after_epochs) * num_episodes + i
             self.episode_manager_imagination.save(episode, episode_id, epoch)
 
-            metrics_episode = {k: v for k, v in episode.compute_metrics().__dict__.items()}
-            metrics_episode['episode_num'] = episode_id
-            metrics_episode['action_histogram'] = wandb.Histogram(episode.actions.numpy(), num_bins=self.agent.world_model.act_vocab_size)
+            metrics_episode = {
+                'episode_length': lengths[i].item(),
+                'episode_return': returns[i].item(),
+                'episode_num': episode_id,
+                'action_histogram': wandb.Histogram(np_histogram=(np.bincount(actions[i, :lengths[i]].numpy(), minlength=num_actions), bin_edges)),
+            }
             to_log.append({f'{mode_str}/{k}': v for k, v in metrics_episode.items()})
 
         return to_log
 
+    @staticmethod
+    def _write_atomic(save_fn, path: Path) -> None:
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        save_fn(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _optimizer_state_to_cpu(self, optimizer: torch.optim.Optimizer) -> Dict[str, Any]:
+        state_dict = optimizer.state_dict()
+        state = {k: {kk: vv.to('cpu', non_blocking=True) if torch.is_tensor(vv) else vv for kk, vv in v.items()} for k, v in state_dict['state'].items()}
+        return {'state': state, 'param_groups': state_dict['param_groups']}
+
     def _save_checkpoint(self, epoch: int, save_agent_only: bool) -> None:
-        torch.save(self.agent.state_dict(), self.ckpt_dir / 'last.pt')
+        if self._checkpoint_future is not None:
+            self._checkpoint_future.result()  # previous save must land before overwriting its files
+
+        # Snapshot everything to CPU now, so the background thread only does disk I/O while training resumes.
+        agent_state_dict = {k: v.detach().to('cpu', non_blocking=True).contiguous() for k, v in self.agent.state_dict().items()}
+        optimizers_state_dict = None if save_agent_only else {
+            "optimizer_tokenizer": self._optimizer_state_to_cpu(self.optimizer_tokenizer),
+            "optimizer_world_model": self._optimizer_state_to_cpu(self.optimizer_world_model),
+            "optimizer_actor_critic": self._optimizer_state_to_cpu(self.optimizer_actor_critic),
+        }
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize()
+
         if not save_agent_only:
-            torch.save(epoch, self.ckpt_dir / 'epoch.pt')
-            torch.save({
-                "optimizer_tokenizer": self.optimizer_tokenizer.state_dict(),
-                "optimizer_world_model": self.optimizer_world_model.state_dict(),
-                "optimizer_actor_critic": self.optimizer_actor_critic.state_dict(),
-            }, self.ckpt_dir / 'optimizer.pt')
             ckpt_dataset_dir = self.ckpt_dir / 'dataset'
             ckpt_dataset_dir.mkdir(exist_ok=True, parents=False)
             self.train_dataset.update_disk_checkpoint(ckpt_dataset_dir)
-            if self.cfg.evaluation_settings.should:
-                torch.save(self.test_dataset.num_seen_episodes, self.ckpt_dir / 'num_seen_episodes_test_dataset.pt')
+
+        def write_checkpoint():
+            self._write_atomic(lambda p: save_file(agent_state_dict, str(p)), self.ckpt_dir / 'last.safetensors')
+            if not save_agent_only:
+                self._write_atomic(lambda p: torch.save(epoch, p), self.ckpt_dir / 'epoch.pt')
+                self._write_atomic(lambda p: torch.save(optimizers_state_dict, p), self.ckpt_dir / 'optimizer.pt')
+                if self.cfg.evaluation_settings.should:
+                    self._write_atomic(lambda p: torch.save(self.test_dataset.num_seen_episodes, p), self.ckpt_dir / 'num_seen_episodes_test_dataset.pt')
+
+        self._checkpoint_future = self._checkpoint_executor.submit(write_checkpoint)
 
     def save_checkpoint(self, epoch: int, save_agent_only: bool) -> None:
-        tmp_checkpoint_dir = Path('checkpoints_tmp')
-        shutil.copytree(src=self.ckpt_dir, dst=tmp_checkpoint_dir, ignore=shutil.ignore_patterns('dataset'))
+        # No pre-backup needed: every file is written to a .tmp sibling and os.replace'd atomically.
         self._save_checkpoint(epoch, save_agent_only)
-        shutil.rmtree(tmp_checkpoint_dir)
 
     def load_checkpoint(self) -> None:
         assert self.ckpt_dir.is_dir()
         self.start_epoch = torch.load(self.ckpt_dir / 'epoch.pt') + 1
-        self.agent.load(self.ckpt_dir / 'last.pt', device=self.device)
+        agent_ckpt_path = self.ckpt_dir / 'last.safetensors'
+        if not agent_ckpt_path.is_file():
+            agent_ckpt_path = self.ckpt_dir / 'last.pt'  # run directories checkpointed before the safetensors switch
+        self.agent.load(agent_ckpt_path, device=self.device)
         ckpt_opt = torch.load(self.ckpt_dir / 'optimizer.pt', map_location=self.device)
         self.optimizer_tokenizer.load_state_dict(ckpt_opt['optimizer_tokenizer'])
         self.optimizer_world_model.load_state_dict(ckpt_opt['optimizer_world_model'])
@@ -299,7 +430,11 @@ class Trainer:
         print(f'Successfully loaded model, optimizer and {len(self.train_dataset)} episodes from {self.ckpt_dir.absolute()}.')
 
     def _to_device(self, batch: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
-        return {k: batch[k].to(self.device) for k in batch}
+        return {k: batch[k].to(self.device, non_blocking=True) for k in batch}
 
     def finish(self) -> None:
+        if self._checkpoint_future is not None:
+            self._checkpoint_future.result()
         wandb.finish()
+        if self.is_distributed:
+            torch.distributed.destroy_process_group()
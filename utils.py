@@ -1,8 +1,10 @@
 from collections import OrderedDict
 import cv2
 from pathlib import Path
+import queue
 import random
 import shutil
+import threading
 
 import numpy as np
 import torch
@@ -11,7 +13,7 @@ import torch.nn as nn
 from episode import Episode
 
 
-def configure_optimizer(model, learning_rate, weight_decay, *blacklist_module_names):
+def configure_optimizer(model, learning_rate, weight_decay, *blacklist_module_names, fused=False):
     """Credits to https://github.com/karpathy/minGPT"""
     # separate out all parameters to those that will and won't experience regularizing weight decay
     decay = set()
@@ -45,7 +47,7 @@ def configure_optimizer(model, learning_rate, weight_decay, *blacklist_module_na
         {"params": [param_dict[pn] for pn in sorted(list(decay))], "weight_decay": weight_decay},
         {"params": [param_dict[pn] for pn in sorted(list(no_decay))], "weight_decay": 0.0},
     ]
-    optimizer = torch.optim.AdamW(optim_groups, lr=learning_rate)
+    optimizer = torch.optim.AdamW(optim_groups, lr=learning_rate, fused=fused)
     return optimizer
 
 
@@ -95,7 +97,7 @@ def compute_lambda_returns(rewards, values, ends, gamma, lambda_):
 class LossWithIntermediateLosses:
     def __init__(self, **kwargs):
         self.loss_total = sum(kwargs.values())
-        self.intermediate_losses = {k: v.item() for k, v in kwargs.items()}
+        self.intermediate_losses = {k: v.detach() for k, v in kwargs.items()}  # kept on device, .item() would force a sync
 
     def __truediv__(self, value):
         for k, v in self.intermediate_losses.items():
@@ -104,6 +106,52 @@ class LossWithIntermediateLosses:
         return self
 
 
+class Prefetcher:
+    """Double-buffered background batch loader.
+
+    A worker thread runs sample_fn and issues the H2D copy on a side CUDA stream,
+    so sampling and transfer of batch N+1 overlap with compute on batch N. next()
+    only blocks if the worker has not finished the upcoming batch.
+    """
+    def __init__(self, sample_fn, num_batches: int, device: torch.device, depth: int = 2) -> None:
+        self.sample_fn = sample_fn
+        self.device = device
+        self.copy_stream = torch.cuda.Stream(device) if device.type == 'cuda' else None
+        self.queue = queue.Queue(maxsize=depth)
+        self.thread = threading.Thread(target=self._worker, args=(num_batches,), daemon=True)
+        self.thread.start()
+
+    def _worker(self, num_batches: int) -> None:
+        for _ in range(num_batches):
+            try:
+                batch = self.sample_fn()
+                if self.copy_stream is not None:
+                    with torch.cuda.stream(self.copy_stream):
+                        batch = {k: v.to(self.device, non_blocking=True) for k, v in batch.items()}
+                    event = torch.cuda.Event()
+                    event.record(self.copy_stream)
+                else:
+                    batch = {k: v.to(self.device) for k, v in batch.items()}
+                    event = None
+            except Exception as e:
+                self.queue.put((e, None))  # re-raised in next(), a dead worker must not hang the consumer
+                return
+            self.queue.put((batch, event))
+
+    def next(self):
+        batch, event = self.queue.get()
+        if isinstance(batch, Exception):
+            raise batch
+        if event is not None:
+            torch.cuda.current_stream().wait_event(event)
+            for v in batch.values():
+                v.record_stream(torch.cuda.current_stream())  # don't let the allocator reuse before the copy lands
+        return batch
+
+    def join(self) -> None:
+        self.thread.join()
+
+
 class EpisodeDirManager:
     def __init__(self, episode_dir: Path, max_num_episodes: int) -> None:
         self.episode_dir = episode_dir